@@ -2,50 +2,102 @@
 AWS Kinesis Firehose client for streaming events.
 """
 
-import json
+import gzip
 import logging
+import os
+import random
+import threading
+from collections import deque
+from decimal import Decimal
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import time
-import backoff
+import orjson
 
 logger = logging.getLogger(__name__)
 
 try:
     import boto3
-    from botocore.exceptions import ClientError
+    from botocore.config import Config
+    from botocore.exceptions import ClientError, EndpointConnectionError
     BOTO3_AVAILABLE = True
+    # Errors worth retrying; anything else fails the call immediately
+    RETRYABLE_ERRORS = (ClientError, EndpointConnectionError)
 except ImportError:
     BOTO3_AVAILABLE = False
+    RETRYABLE_ERRORS = ()
     logger.warning("boto3 not available, using mock client")
 
+# Attempts per Firehose call, including the first one
+MAX_ATTEMPTS = 3
+
+# HTTP connections kept open to Firehose, enough for concurrent batch flushes
+MAX_POOL_CONNECTIONS = 64
+
+# Events are packed as newline-delimited JSON into records of about this size
+MAX_RECORD_BYTES = 25_000
+# Uncompressed bytes packed per record when records are gzipped (level 1 shrinks event JSON ~4x)
+MAX_COMPRESSED_RECORD_BYTES = 4 * MAX_RECORD_BYTES
+# Initial size of each thread's packing buffer; it grows as needed and is never shrunk
+PACK_BUFFER_BYTES = 32_768
+
+# Keep events sent to the mock client for inspection (MOCK_RECORD=1)
+MOCK_RECORD = os.getenv("MOCK_RECORD", "0") == "1"
+# Most recent events kept by a recording mock client
+MOCK_RECORD_SIZE = 1024
+
+# Value of the 'source' metadata field added to every record
+SOURCE = 'game_analytics_api'
+
+
+# (monotonic time, ISO timestamp) of the last ts_now() refresh
+_TS_CACHE = [(float('-inf'), '')]
+# How long ts_now() reuses a formatted timestamp, in seconds
+TS_CACHE_TTL = 0.001
+
+
+def ts_now() -> str:
+    """Current UTC time as an ISO 8601 string, reformatted at most once per millisecond."""
+    now = time.monotonic()
+    cached_at, ts = _TS_CACHE[0]
+    if now - cached_at < TS_CACHE_TTL:
+        return ts
+    ts = datetime.utcnow().isoformat()
+    _TS_CACHE[0] = (now, ts)
+    return ts
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize types orjson doesn't handle natively."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
 class DeadLetterQueue:
     """Failed events için temporary queue."""
     def __init__(self, max_size: int = 1000):
-        self.failed_events = []
+        # En eski event, kuyruk dolunca otomatik silinir
+        self.failed_events = deque(maxlen=max_size)
         self.max_size = max_size
     
     def add_failed_event(self, event: Dict[str, Any], error: str):
         """Add failed event to queue."""
-        if len(self.failed_events) >= self.max_size:
-            # En eski eventi sil
-            self.failed_events.pop(0)
-        
         failed_event = {
             "event": event,
             "error": error,
-            "failed_at": datetime.utcnow().isoformat(),
+            "failed_at": ts_now(),
             "retry_count": 0
         }
         self.failed_events.append(failed_event)
-        logger.warning(f"Event added to DLQ: {event.get('event_id')}")
+        logger.warning("Event added to DLQ: %s", event.get('event_id'))
 
 
 class FirehoseClient:
     """AWS Kinesis Firehose client."""
     
     def __init__(self, stream_name: str, region_name: str = "us-east-1", 
-                 use_mock: bool = False):
+                 use_mock: bool = False, compress: bool = False):
         """
         Initialize Firehose client.
         
@@ -53,69 +105,105 @@ class FirehoseClient:
             stream_name: Kinesis Firehose stream name
             region_name: AWS region
             use_mock: Use mock client for testing
+            compress: Gzip each batched record (the delivery stream must
+                not compress again, so S3 objects stay valid .gz files)
         """
         self.stream_name = stream_name
         self.region_name = region_name
+        self.compress = compress
+        self._record_limit = MAX_COMPRESSED_RECORD_BYTES if compress else MAX_RECORD_BYTES
+        # Batches are packed on several executor threads, each with its own buffer
+        self._local = threading.local()
+        self.dlq = DeadLetterQueue() # Temporary queue for failed events
+        # Static part of the record metadata, serialized once
+        self._prefix = b'{"source":' + orjson.dumps(SOURCE) + b',"ingestion_timestamp":'
         
         if use_mock or not BOTO3_AVAILABLE:
             self.client = MockFirehoseClient()
             logger.info("Using mock Firehose client")
         else:
             try:
-                self.client = boto3.client('firehose', region_name=region_name)
+                self.client = boto3.client(
+                    'firehose',
+                    region_name=region_name,
+                    config=Config(
+                        max_pool_connections=MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        # _call_with_retry owns the retry policy
+                        retries={'max_attempts': 0, 'mode': 'standard'}
+                    )
+                )
                 logger.info("Using real AWS Firehose client")
             except Exception as e:
                 logger.error(f"Failed to create AWS client: {e}")
                 self.client = MockFirehoseClient()
                 logger.info("Falling back to mock client")
-                self.dlq = DeadLetterQueue() # Temporary queue for failed events
-                
     
-    # Decorator to retry on exceptions with exponential backoff
-    @backoff.on_exception(
-    backoff.expo,
-    Exception,
-    max_tries=3
-    )
+    @property
+    def client(self):
+        """Underlying boto3 or mock Firehose client."""
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        # Resolve real vs mock dispatch once instead of probing on every send
+        self._client = client
+        self._put_record = getattr(client, 'put_record', None)
+        self._put_batch = getattr(client, 'put_record_batch', None)
+        self._describe_stream = getattr(client, 'describe_delivery_stream', None)
+        self._is_real = self._put_record is not None or self._put_batch is not None
+
+    def _call_with_retry(self, operation, **kwargs):
+        """Call a Firehose operation, retrying AWS errors with capped exponential backoff."""
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return operation(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(0.05 * 2 ** attempt, 1.0) + random.random() * 0.05
+                logger.warning("Firehose call failed (%s), retrying in %.2fs", e, delay)
+                time.sleep(delay)
     
     def send_event(self, event_data: Dict[str, Any]) -> bool:
         """Send single event to Firehose."""
-        logger.info(f"send_event called with: {event_data.get('event_id')}")
+        logger.debug("send_event called with: %s", event_data.get('event_id'))
         try:
             # Add metadata
             record_data = {
-                'ingestion_timestamp': datetime.utcnow().isoformat(),
-                'source': 'game_analytics_api',
+                'ingestion_timestamp': ts_now(),
+                'source': SOURCE,
                 **event_data
             }
             
             # Convert to JSON with newline (required for Firehose)
-            json_data = json.dumps(record_data) + '\n'
+            json_data = orjson.dumps(record_data, default=_json_default) + b'\n'
             
-            logger.info(f"About to call AWS put_record for stream: {self.stream_name}")
-            if hasattr(self.client, 'put_record'):
+            logger.debug("About to call AWS put_record for stream: %s", self.stream_name)
+            if self._is_real:
                 # Real AWS client
-                response = self.client.put_record(
+                response = self._call_with_retry(
+                    self._put_record,
                     DeliveryStreamName=self.stream_name,
                     Record={'Data': json_data}
                 )
-                logger.info(f"AWS put_record response: {response}")
+                logger.debug("AWS put_record response: %s", response)
                 return response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200
             else:
                 # Mock client
                 return self.client.send_event(record_data)
                 
         except Exception as e:
-            logger.error(f"Failed to send event to Firehose: {e}")
+            logger.error("Failed to send event to Firehose: %s", e)
             self.dlq.add_failed_event(event_data, str(e))
             return False
     
     def health_check(self) -> bool:
         """Check if Firehose is accessible."""
         try:
-            if hasattr(self.client, 'describe_delivery_stream'):
+            if self._describe_stream is not None:
                 # Real AWS client
-                response = self.client.describe_delivery_stream(
+                response = self._describe_stream(
                     DeliveryStreamName=self.stream_name
                 )
                 status = response.get('DeliveryStreamDescription', {}).get('DeliveryStreamStatus')
@@ -129,10 +217,24 @@ class FirehoseClient:
 
     def send_events_batch(self, events: List[Dict[str, Any]]) -> bool:
         """Send multiple events in batch."""
+        return self.send_serialized_batch(
+            [orjson.dumps(event, default=_json_default) for event in events],
+            # Decided from the dicts, since 'source' may also appear nested
+            has_source=['source' in event for event in events]
+        )
+
+    def send_serialized_batch(self, events: List[bytes],
+                              has_source: Optional[List[bool]] = None) -> bool:
+        """Send multiple events, each already serialized as a compact JSON object.
+
+        has_source says whether each event has its own top-level 'source'
+        field. When omitted it is detected by searching each event's bytes,
+        which is only reliable for flat events such as the API's models.
+        """
         if not events:
             return True
     
-        logger.info(f"Sending batch of {len(events)} events")
+        logger.debug("Sending batch of %d events", len(events))
 
         # AWS Firehose max 500 records per batch
         batch_size = 500
@@ -140,59 +242,127 @@ class FirehoseClient:
     
         for i in range(0, len(events), batch_size):
             batch = events[i:i + batch_size]
-            success = self._send_single_batch(batch)
+            batch_has_source = has_source[i:i + batch_size] if has_source is not None else None
+            success = self._send_single_batch(batch, batch_has_source)
             if not success:
                 all_success = False
     
         return all_success
 
-    def _send_single_batch(self, events: List[Dict[str, Any]]) -> bool:
-        """Send a single batch of events."""
-        records = []
-        for event in events:
-            record_data = {
-                'ingestion_timestamp': datetime.utcnow().isoformat(),
-                'source': 'game_analytics_api',
-                **event
-            }
-            records.append({'Data': json.dumps(record_data) + '\n'})
-    
+    def _send_single_batch(self, events: List[bytes],
+                           has_source: Optional[List[bool]] = None) -> bool:
+        """Send a single batch of serialized events."""
         try:
-            if hasattr(self.client, 'put_record_batch'):
+            if self._is_real:
                 # Real AWS client
-                response = self.client.put_record_batch(
+                response = self._call_with_retry(
+                    self._put_batch,
                     DeliveryStreamName=self.stream_name,
-                    Records=records
+                    Records=self._pack_records(events, has_source)
                 )
                 failed_count = response.get('FailedPutCount', 0)
                 if failed_count > 0:
-                    logger.warning(f"Batch had {failed_count} failed records")
+                    logger.warning("Batch had %d failed records", failed_count)
                 return failed_count == 0
             else:
                 # Mock client - simulate batch success
-                for event in events:
-                    self.client.send_event(event)
-                return True
+                return self.client.send_serialized_batch(events)
             
         except Exception as e:
-            logger.error(f"Batch send failed: {e}")
+            logger.error("Batch send failed: %s", e)
             # Add all events to DLQ
             for event in events:
-                self.dlq.add_failed_event(event, str(e))
+                self.dlq.add_failed_event(orjson.loads(event), str(e))
             return False
 
+    def _pack_records(self, events: List[bytes],
+                      has_source: Optional[List[bool]] = None) -> List[Dict[str, bytes]]:
+        """Pack events as newline-delimited JSON into records of up to MAX_RECORD_BYTES.
+
+        With compression enabled, up to MAX_COMPRESSED_RECORD_BYTES of JSON
+        is packed per record and gzipped.
+        """
+        records = []
+        buf = self._pack_buffer()
+        pos = 0
+        # One ingestion timestamp for the whole batch
+        ts = ts_now()
+        ts_json = orjson.dumps(ts)
+        head = self._prefix + ts_json + b','
+        # An event's own 'source' wins, as it would in a dict merge
+        head_own_source = b'{"ingestion_timestamp":' + ts_json + b','
+        
+        for i, body in enumerate(events):
+            # A nested "ingestion_timestamp" key only sends the event down the
+            # (correct, slower) dict merge path below
+            if len(body) > 2 and b'"ingestion_timestamp":' not in body:
+                # Splice the metadata in front of the event's own fields
+                own_source = has_source[i] if has_source is not None else b'"source":' in body
+                prefix = head_own_source if own_source else head
+            else:
+                record_data = {'ingestion_timestamp': ts, 'source': SOURCE, **orjson.loads(body)}
+                body = orjson.dumps(record_data)
+                prefix = b'{'
+            
+            # prefix + body without its leading '{' + newline
+            size = len(prefix) + len(body)
+            if pos and pos + size > self._record_limit:
+                records.append({'Data': self._record_data(buf, pos)})
+                pos = 0
+            
+            end = pos + size
+            if end > len(buf):
+                buf.extend(bytes(max(end, 2 * len(buf)) - len(buf)))
+            buf[pos:pos + len(prefix)] = prefix
+            pos += len(prefix)
+            buf[pos:end - 1] = memoryview(body)[1:]
+            buf[end - 1] = 0x0A  # '\n'
+            pos = end
+        
+        if pos:
+            records.append({'Data': self._record_data(buf, pos)})
+        return records
+    
+    def _pack_buffer(self) -> bytearray:
+        """This thread's reusable packing buffer."""
+        buf = getattr(self._local, 'pack_buf', None)
+        if buf is None:
+            buf = self._local.pack_buf = bytearray(PACK_BUFFER_BYTES)
+        return buf
+    
+    def _record_data(self, buf: bytearray, length: int) -> bytes:
+        """Final record payload for the first length bytes of the packing buffer."""
+        with memoryview(buf) as view, view[:length] as packed:
+            if self.compress:
+                # Gzip members concatenate, so delivered S3 objects stay valid .gz files
+                return gzip.compress(packed, compresslevel=1)
+            return bytes(packed)
+
 class MockFirehoseClient:
     """Mock Firehose client for testing."""
     
-    def __init__(self):
-        self.sent_events = []
+    def __init__(self, record: Optional[bool] = None):
+        """
+        Initialize mock client.
+        
+        Args:
+            record: Keep the last MOCK_RECORD_SIZE sent events for
+                get_sent_events (defaults to the MOCK_RECORD env var)
+        """
+        self.record = MOCK_RECORD if record is None else record
+        self.sent_events = deque(maxlen=MOCK_RECORD_SIZE)
         logger.info("Mock Firehose client initialized")
     
     def send_event(self, event_data: Dict[str, Any]) -> bool:
         """Mock send event."""
-        self.sent_events.append(event_data)
-        logger.info(f"Real AWS: Attempting to send event - {event_data.get('event_id')}")
-        logger.info(f"Mock: Event sent - {event_data.get('event_id')}")
+        if self.record:
+            self.sent_events.append(event_data)
+        return True
+    
+    def send_serialized_batch(self, events: List[bytes]) -> bool:
+        """Mock send of serialized events."""
+        if self.record:
+            self.sent_events.extend(orjson.loads(event) for event in events)
         return True
     
     def health_check(self) -> bool:
@@ -201,4 +371,4 @@ class MockFirehoseClient:
     
     def get_sent_events(self):
         """Get all sent events (for testing)."""
-        return self.sent_events.copy()
\ No newline at end of file
+        return list(self.sent_events)
\ No newline at end of file
@@ -4,16 +4,27 @@ Game Analytics API - FastAPI application for receiving game events.
 
 import os
 import sys
+import asyncio
+import hmac
 import logging
-from datetime import datetime
-from typing import Dict, Any, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List
 from fastapi.responses import JSONResponse
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, status, Request
+from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import HTTPBearer
+from pydantic import ValidationError
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(__file__))
 
@@ -21,16 +32,18 @@ sys.path.append(os.path.dirname(__file__))
 try:
     from models import (
         InstallEventModel, PurchaseEventModel, 
-        EventResponse, ErrorResponse, HealthResponse
+        EventResponse, ErrorResponse, HealthResponse,
+        EVENT_BATCH, MAX_BATCH_EVENTS
     )
-    from firehose_client import FirehoseClient
+    from firehose_client import FirehoseClient, ts_now
 except ImportError:
     # Fallback to relative imports
     from .models import (
         InstallEventModel, PurchaseEventModel, 
-        EventResponse, ErrorResponse, HealthResponse
+        EventResponse, ErrorResponse, HealthResponse,
+        EVENT_BATCH, MAX_BATCH_EVENTS
     )
-    from .firehose_client import FirehoseClient
+    from .firehose_client import FirehoseClient, ts_now
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -38,16 +51,112 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 API_KEY = os.getenv("API_KEY", "your-api-key-here")
+API_KEY_BYTES = API_KEY.encode()
 FIREHOSE_STREAM_NAME = os.getenv("FIREHOSE_STREAM_NAME", "game-events-stream") 
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 USE_MOCK_FIREHOSE = os.getenv("USE_MOCK_FIREHOSE", "true").lower() == "true"
+FIREHOSE_FLUSH_MS = int(os.getenv("FIREHOSE_FLUSH_MS", "200"))
+FIREHOSE_MAX_BATCH = int(os.getenv("FIREHOSE_MAX_BATCH", "500"))  # PutRecordBatch limit
+FIREHOSE_MAX_WORKERS = int(os.getenv("FIREHOSE_MAX_WORKERS", "8"))
+AGGREGATE_COMPRESS = os.getenv("AGGREGATE_COMPRESS", "false").lower() == "true"
+# Events buffered for Firehose before request handlers wait for room
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+# Largest /events/batch body accepted after zstd decompression
+MAX_DECOMPRESSED_BATCH_BYTES = 4 * 1024 * 1024
 
 # Initialize Firehose client
 firehose_client = FirehoseClient(
     stream_name=FIREHOSE_STREAM_NAME,
     region_name=AWS_REGION,
-    use_mock=USE_MOCK_FIREHOSE
+    use_mock=USE_MOCK_FIREHOSE,
+    compress=AGGREGATE_COMPRESS
 )
+# boto3 calls block, so they run on this pool instead of the event loop
+firehose_executor = ThreadPoolExecutor(
+    max_workers=FIREHOSE_MAX_WORKERS,
+    thread_name_prefix="firehose"
+)
+
+
+async def batch_flusher(event_queue: asyncio.Queue):
+    """Drain the event queue into Firehose batches.
+
+    A batch is flushed once it reaches FIREHOSE_MAX_BATCH events or
+    FIREHOSE_FLUSH_MS after its first event, whichever comes first.
+    """
+    loop = asyncio.get_running_loop()
+    batch = []
+    in_flight = set()
+    try:
+        while True:
+            batch.append(await event_queue.get())
+            deadline = loop.time() + FIREHOSE_FLUSH_MS / 1000
+
+            while len(batch) < FIREHOSE_MAX_BATCH:
+                try:
+                    batch.append(event_queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(event_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            events_data, batch = batch, []
+            future = loop.run_in_executor(firehose_executor, flush_batch, events_data)
+            in_flight.add(future)
+            future.add_done_callback(in_flight.discard)
+
+            # Keep at most one batch in flight per worker thread
+            if len(in_flight) >= FIREHOSE_MAX_WORKERS:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Send a partially collected batch rather than handing it back to a
+        # queue that may have filled up again
+        if batch:
+            in_flight.add(loop.run_in_executor(firehose_executor, flush_batch, batch))
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+
+def flush_batch(events_data: List[bytes]):
+    """Send a batch of queued events to Firehose."""
+    try:
+        success = firehose_client.send_serialized_batch(events_data)
+        if not success:
+            logger.error("Failed to flush batch to Firehose: %d events", len(events_data))
+    except Exception as e:
+        logger.error("Error flushing batch to Firehose: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the Firehose batch flusher for the lifetime of the app."""
+    # Created here so the queue belongs to the loop serving this app run;
+    # bounded so a slow Firehose makes producers wait instead of growing memory
+    event_queue = app.state.event_queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    flusher = asyncio.create_task(batch_flusher(event_queue))
+    yield
+    flusher.cancel()
+    try:
+        await flusher
+    except asyncio.CancelledError:
+        pass
+
+    # Drain whatever is still queued before shutting down
+    remaining = []
+    while not event_queue.empty():
+        remaining.append(event_queue.get_nowait())
+    if remaining:
+        logger.info("Draining %d queued events on shutdown", len(remaining))
+        await asyncio.get_running_loop().run_in_executor(firehose_executor, flush_batch, remaining)
+
+
 # Rate limiter setup
 limiter = Limiter(key_func=get_remote_address)
 
@@ -55,7 +164,8 @@ limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(
     title="Game Analytics API",
     description="API for collecting game events",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Rate limiter'ı app'e bağla
@@ -68,9 +178,8 @@ security = HTTPBearer()
 
 def verify_api_key(credentials = Depends(security)):
     """Verify API key."""
-    print(f"DEBUG - Expected API_KEY: '{API_KEY}'")
-    print(f"DEBUG - Received credentials: '{credentials.credentials}'")
-    if credentials.credentials != API_KEY:
+    # Constant-time compare so response timing doesn't leak the key
+    if not hmac.compare_digest(credentials.credentials.encode(), API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
@@ -78,28 +187,6 @@ def verify_api_key(credentials = Depends(security)):
     return credentials.credentials
 
 
-async def send_to_firehose(event_data: Dict[str, Any]):
-    """Send event to Firehose in background."""
-    logger.info(f"Background task started for event: {event_data.get('event_id')}")
-    try:
-        success = firehose_client.send_event(event_data)
-        if not success:
-            logger.error(f"Failed to send event to Firehose: {event_data.get('event_id')}")
-    except Exception as e:
-        logger.error(f"Error sending to Firehose: {e}")
-
-async def send_batch_to_firehose(events_data: List[Dict[str, Any]]):
-    """Send batch of events to Firehose in background."""
-    logger.info(f"Background batch processing started for {len(events_data)} events")
-    try:
-        success = firehose_client.send_events_batch(events_data)
-        if success:
-            logger.info(f"Batch processing successful: {len(events_data)} events")
-        else:
-            logger.error(f"Batch processing failed: {len(events_data)} events")
-    except Exception as e:
-        logger.error(f"Error in batch processing: {e}")
-
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -113,14 +200,14 @@ async def health_check():
         # Basit version - sadece temel check
         return HealthResponse(
             status="healthy",
-            timestamp=datetime.utcnow(),
+            timestamp=ts_now(),
             version="1.0.0"
         )
     except Exception as e:
         logger.error(f"Health check error: {e}")
         return HealthResponse(
             status="error",
-            timestamp=datetime.utcnow(),
+            timestamp=ts_now(),
             version="1.0.0"
         )
 
@@ -130,27 +217,24 @@ async def health_check():
 async def receive_install_event(
     request: Request,
     event: InstallEventModel,
-    background_tasks: BackgroundTasks,
     api_key: str = Depends(verify_api_key)
 ):
     """Receive install event."""
     try:
-        # Convert to dict and send to Firehose
-        event_data = event.model_dump()
-        event_data['timestamp'] = event_data['timestamp'].isoformat()
-        background_tasks.add_task(send_to_firehose, event_data)
+        # Serialize and queue for Firehose
+        await request.app.state.event_queue.put(event.model_dump_json().encode())
         
-        logger.info(f"Install event received: {event.event_id}")
+        logger.debug("Install event received: %s", event.event_id)
         
         return EventResponse(
             success=True,
             event_id=event.event_id,
             message="Install event received",
-            timestamp=datetime.utcnow()
+            timestamp=ts_now()
         )
         
     except Exception as e:
-        logger.error(f"Error processing install event: {e}")
+        logger.error("Error processing install event: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -162,70 +246,112 @@ async def receive_install_event(
 async def receive_purchase_event(
     request: Request,
     event: PurchaseEventModel,
-    background_tasks: BackgroundTasks,
     api_key: str = Depends(verify_api_key)
 ):
     """Receive purchase event."""
     try:
-        # Convert to dict and send to Firehose
-        event_data = event.model_dump()
-        event_data['timestamp'] = event_data['timestamp'].isoformat()
-        background_tasks.add_task(send_to_firehose, event_data)
+        # Serialize and queue for Firehose
+        await request.app.state.event_queue.put(event.model_dump_json().encode())
         
-        logger.info(f"Purchase event received: {event.event_id}")
+        logger.debug("Purchase event received: %s", event.event_id)
         
         return EventResponse(
             success=True,
             event_id=event.event_id,
             message="Purchase event received",
-            timestamp=datetime.utcnow()
+            timestamp=ts_now()
         )
         
     except Exception as e:
-        logger.error(f"Error processing purchase event: {e}")
+        logger.error("Error processing purchase event: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
 
+# Messages for errors about the batch as a whole rather than one event
+BATCH_ERROR_MESSAGES = {
+    "json_invalid": "Batch must be valid JSON",
+    "list_type": "Batch must be a list of events",
+    "too_short": "Batch cannot be empty",
+    "too_long": f"Batch size cannot exceed {MAX_BATCH_EVENTS} events",
+}
+
+
+def decompress_batch_body(body: bytes) -> bytes:
+    """Decompress a zstd-encoded batch body, refusing oversized output."""
+    if not ZSTD_AVAILABLE:
+        raise HTTPException(
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            "zstd Content-Encoding is not supported by this server"
+        )
+    try:
+        # Read at most one byte past the limit so a zip bomb can't exhaust memory;
+        # a body may hold several concatenated frames (e.g. from a streaming compressor)
+        with zstandard.ZstdDecompressor().stream_reader(body, read_across_frames=True) as reader:
+            data = reader.read(MAX_DECOMPRESSED_BATCH_BYTES + 1)
+    except zstandard.ZstdError:
+        raise HTTPException(400, "Batch must be valid zstd")
+    if len(data) > MAX_DECOMPRESSED_BATCH_BYTES:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"Decompressed batch cannot exceed {MAX_DECOMPRESSED_BATCH_BYTES} bytes"
+        )
+    return data
+
+
 @app.post("/events/batch")
 @limiter.limit("10/minute")
 async def receive_events_batch(
     request: Request,
-    events: List[Union[InstallEventModel, PurchaseEventModel]],
-    background_tasks: BackgroundTasks,
     api_key: str = Depends(verify_api_key)
 ):
     """Receive multiple events in batch."""
-    # Validation
-    if len(events) > 500:
-        raise HTTPException(400, "Batch size cannot exceed 500 events")
-    if len(events) == 0:
-        raise HTTPException(400, "Batch cannot be empty")
+    body = await request.body()
+    content_encoding = request.headers.get("content-encoding", "identity").lower()
+    if content_encoding == "zstd":
+        body = decompress_batch_body(body)
+    elif content_encoding != "identity":
+        raise HTTPException(
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            f"Unsupported Content-Encoding: {content_encoding}"
+        )
     
-    logger.info(f"Batch received with {len(events)} events")
+    # Parse and validate the whole batch in pydantic-core; the size limits
+    # are checked before any event is validated
+    try:
+        events = EVENT_BATCH.validate_json(body)
+    except ValidationError as e:
+        errors = e.errors(include_url=False)
+        batch_error = next((err for err in errors if not err["loc"]), None)
+        if batch_error is not None:
+            raise HTTPException(400, BATCH_ERROR_MESSAGES.get(
+                batch_error["type"], batch_error["msg"]
+            ))
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in errors
+        ])
+    
+    logger.debug("Batch received with %d events", len(events))
+    events_data = [event.model_dump_json().encode() for event in events]
     
     try:
-        # Convert all events to dict format
-        events_data = []
-        for event in events:
-            event_data = event.model_dump()
-            event_data['timestamp'] = event_data['timestamp'].isoformat()
-            events_data.append(event_data)
-        
-        # Background batch processing
-        background_tasks.add_task(send_batch_to_firehose, events_data)
+        # Queue only once the whole batch is valid, so it is accepted or rejected as a unit;
+        # a full queue makes the request wait rather than drop part of the batch
+        event_queue = request.app.state.event_queue
+        for event_data in events_data:
+            await event_queue.put(event_data)
         
         return {
             "success": True,
-            "accepted_events": len(events),
-            "message": f"Batch of {len(events)} events accepted",
-            "timestamp": datetime.utcnow()
+            "accepted_events": len(events_data),
+            "message": f"Batch of {len(events_data)} events accepted",
+            "timestamp": ts_now()
         }
         
     except Exception as e:
-        logger.error(f"Error processing batch: {e}")
+        logger.error("Error processing batch: %s", e)
         raise HTTPException(500, str(e))
     
 # Error handlers
@@ -238,7 +364,7 @@ async def http_exception_handler(request, exc):
             "success": False,
             "error": "HTTPException", 
             "message": exc.detail,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": ts_now()
         }
     )
 
@@ -3,14 +3,18 @@ Pydantic models for the analytics API.
 """
 
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, Any, List, Literal, Optional, Union
+from pydantic import (
+    BaseModel, ConfigDict, Discriminator, Field, Tag, TypeAdapter, field_validator
+)
 from decimal import Decimal
 from enum import Enum
 
 
 class BaseEventModel(BaseModel):
     """Base model for all events."""
+    model_config = ConfigDict(str_max_length=256, extra='forbid')
+    
     event_id: str
     user_id: str
     game_id: str
@@ -22,43 +26,66 @@ class BaseEventModel(BaseModel):
 
 class InstallEventModel(BaseEventModel):
     """Model for install events."""
-    event_type: str = Field(default="install")
+    event_type: Literal["install"] = "install"
     source: Optional[str] = None
     country: Optional[str] = None
 
 
 class PurchaseEventModel(BaseEventModel):
     """Model for purchase events."""
-    event_type: str = Field(default="purchase")
+    event_type: Literal["purchase"] = "purchase"
     product_id: str
     product_name: str
-    price: Decimal = Field(ge=0, decimal_places=4)  # Decimal precision for currency and Must be >= 0
+    price: Decimal = Field(ge=0, max_digits=18, decimal_places=4)  # Decimal precision for currency and Must be >= 0
     currency: str
     quantity: int = Field(default=1, gt=0)  # Must be > 0
     store: Optional[str] = None
     transaction_id: Optional[str] = None
     
-    @validator('price')
-    def validate_price_precision(cls, v):
-        """Ensure price has proper decimal precision."""
-        if isinstance(v, (int, float)):
-            v = Decimal(str(v))
-        return v.quantize(Decimal('0.0001'))  # 4 decimal places
-
-    @validator('currency')  
-    def validate_currency_code(cls, v):
+    @field_validator('currency')
+    @classmethod
+    def validate_currency_code(cls, v: str) -> str:
         """Validate currency code format."""
         if not v or len(v) != 3:
             raise ValueError('Currency must be 3-letter ISO code (e.g., USD, EUR)')
         return v.upper()
 
 
+# Maximum number of events accepted by /events/batch
+MAX_BATCH_EVENTS = 500
+
+
+def _event_type_tag(value: Any) -> Optional[str]:
+    """Discriminator for EventModel; infers the type when event_type is omitted."""
+    if isinstance(value, dict):
+        event_type = value.get('event_type')
+        if event_type is None:
+            return 'purchase' if 'product_id' in value else 'install'
+        return event_type
+    return getattr(value, 'event_type', None)
+
+
+# Any event, validated by dispatching on event_type instead of trying each model
+EventModel = Annotated[
+    Union[
+        Annotated[InstallEventModel, Tag('install')],
+        Annotated[PurchaseEventModel, Tag('purchase')],
+    ],
+    Discriminator(_event_type_tag),
+]
+
+# Validator for a /events/batch request body
+EVENT_BATCH = TypeAdapter(
+    Annotated[List[EventModel], Field(min_length=1, max_length=MAX_BATCH_EVENTS)]
+)
+
+
 class EventResponse(BaseModel):
     """Response for successful event processing."""
     success: bool
     event_id: str
     message: str
-    timestamp: datetime
+    timestamp: str  # ISO 8601, UTC
 
 
 class ErrorResponse(BaseModel):
@@ -66,11 +93,11 @@ class ErrorResponse(BaseModel):
     success: bool = False
     error: str
     message: str
-    timestamp: datetime
+    timestamp: str  # ISO 8601, UTC
 
 
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
-    timestamp: datetime
+    timestamp: str  # ISO 8601, UTC
     version: str = "1.0.0"
\ No newline at end of file
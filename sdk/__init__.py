@@ -6,11 +6,15 @@ A simple Python SDK for sending game events to the analytics API.
 
 from .events import InstallEvent, PurchaseEvent
 from .client import GameAnalyticsClient
+from .async_client import AsyncGameAnalyticsClient
+from .pool import EventPool
 
 __version__ = "1.0.0"
 
 __all__ = [
     "InstallEvent",
     "PurchaseEvent", 
-    "GameAnalyticsClient"
+    "GameAnalyticsClient",
+    "AsyncGameAnalyticsClient",
+    "EventPool"
 ]
\ No newline at end of file
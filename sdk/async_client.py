@@ -0,0 +1,301 @@
+"""
+Asynchronous client that batches events before sending them to the analytics API.
+"""
+
+import asyncio
+import logging
+import orjson
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .events import InstallEvent, PurchaseEvent, _json_default
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Batch bodies smaller than this are sent uncompressed; zstd gains little on them
+COMPRESS_MIN_BYTES = 4096
+# Extra headers for a compressed batch, built once; the session supplies the rest
+_ZSTD_HEADERS = {'Content-Encoding': 'zstd'}
+
+Event = Union[InstallEvent, PurchaseEvent]
+# Called with each event and whether its batch was accepted
+EventCallback = Callable[[Event, bool], None]
+
+# Queue marker telling the flush loop to send what it has collected right away
+_FLUSH = object()
+
+
+def _to_dicts(events: List[Event]) -> List[Dict[str, Any]]:
+    """Convert events to dictionaries in the order given, as to_dict() would."""
+    # Same per-class field getters as to_dicts(), so mixed batches keep their order
+    return [dict(zip(event._FIELDS, event._get_fields(event))) for event in events]
+
+
+class AsyncGameAnalyticsClient:
+    """Client that queues events and sends them in batches to /events/batch."""
+
+    def __init__(self, base_url: str, api_key: str, timeout: int = 30,
+                 max_batch: int = 500, max_wait_ms: int = 6000,
+                 max_connections: int = 64, keepalive_timeout: int = 30,
+                 max_concurrent_sends: int = 32, compress: bool = False,
+                 max_queue: int = 10_000):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API base URL
+            api_key: API key for authentication
+            timeout: Request timeout in seconds
+            max_batch: Max events per batch request (the API accepts up to 500)
+            max_wait_ms: Max time an event waits before its batch is sent;
+                the default keeps a steady trickle of events within the
+                API's 10 batches/minute rate limit
+            max_connections: Max open connections to the API
+            keepalive_timeout: Seconds an idle connection is kept open
+            max_concurrent_sends: Max requests in flight during send_events
+            compress: zstd-compress batch bodies of COMPRESS_MIN_BYTES or more
+                (needs the zstandard package)
+            max_queue: Max events waiting to be batched; once reached,
+                send_install_event/send_purchase_event wait for room, so a
+                slow or unavailable API applies backpressure instead of
+                growing memory
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for AsyncGameAnalyticsClient")
+        if compress and not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required for compress=True")
+
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.max_concurrent_sends = max_concurrent_sends
+        self.compress = compress
+        self.max_queue = max_queue
+        # Only used from the flush loop, so one compressor is never shared concurrently
+        self._compressor = zstandard.ZstdCompressor(level=3) if compress else None
+        self._batch_url = f"{self.base_url}/events/batch"
+        # Single-event endpoint for each event class
+        self._event_urls = {
+            InstallEvent: f"{self.base_url}/events/install",
+            PurchaseEvent: f"{self.base_url}/events/purchase",
+        }
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._session = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Open the HTTP session and start the background flush loop."""
+        if self._session is not None:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._session = aiohttp.ClientSession(
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.api_key}'
+            },
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+        )
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def send_install_event(self, event: InstallEvent,
+                                 callback: Optional[EventCallback] = None):
+        """
+        Queue an install event, waiting for room if max_queue events are queued.
+
+        Args:
+            event: InstallEvent to send
+            callback: Called with the event and True/False once its batch is sent;
+                an event from an EventPool is released after a successful send,
+                so the callback must not keep it
+        """
+        await self._enqueue(event, callback)
+
+    async def send_purchase_event(self, event: PurchaseEvent,
+                                  callback: Optional[EventCallback] = None):
+        """
+        Queue a purchase event, waiting for room if max_queue events are queued.
+
+        Args:
+            event: PurchaseEvent to send
+            callback: Called with the event and True/False once its batch is sent;
+                an event from an EventPool is released after a successful send,
+                so the callback must not keep it
+        """
+        await self._enqueue(event, callback)
+
+    async def send_events(self, events: List[Event]) -> List[bool]:
+        """
+        Send events right away to their single-event endpoints, concurrently.
+
+        Unlike send_install_event/send_purchase_event, events are not queued
+        or batched; up to max_concurrent_sends requests are in flight at once.
+
+        Args:
+            events: InstallEvents and PurchaseEvents to send
+
+        Returns:
+            True/False per event, in the order given
+        """
+        if self._session is None:
+            await self.start()
+        semaphore = asyncio.Semaphore(self.max_concurrent_sends)
+
+        async def send(event: Event) -> bool:
+            async with semaphore:
+                return await self._send_one(event)
+
+        return list(await asyncio.gather(*(send(event) for event in events)))
+
+    async def flush(self):
+        """Send queued events now and wait until they have been sent."""
+        if self._queue is not None:
+            await self._queue.put(_FLUSH)
+            await self._queue.join()
+
+    async def close(self):
+        """Send any queued events, then stop the flush loop and close the session."""
+        if self._session is None:
+            return
+
+        await self.flush()
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        await self._session.close()
+        self._session = None
+        self._flush_task = None
+
+    async def _enqueue(self, event: Event, callback: Optional[EventCallback]):
+        """Add event to the send queue, starting the client if needed."""
+        if self._session is None:
+            await self.start()
+        await self._queue.put((event, callback))
+
+    async def _flush_loop(self):
+        """Collect queued events into batches and send them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            item = await self._queue.get()
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while item is not _FLUSH:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+
+                try:
+                    item = self._queue.get_nowait()
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                if batch:
+                    await self._send_batch(batch)
+            finally:
+                # One task_done per item taken, including a flush marker
+                for _ in range(len(batch) + (item is _FLUSH)):
+                    self._queue.task_done()
+
+    async def _send_one(self, event: Event) -> bool:
+        """Send one event to its single-event endpoint."""
+        try:
+            async with self._session.post(
+                self._event_urls[type(event)],
+                data=event.to_json_bytes()
+            ) as response:
+                if response.status == 200:
+                    logger.debug("Event sent successfully: %s", event.event_id)
+                    return True
+                logger.error("Failed to send event: %d", response.status)
+                return False
+
+        except aiohttp.ClientError as e:
+            logger.error("Request failed: %s", e)
+            return False
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+            return False
+
+    async def _send_batch(self, batch: List[Tuple[Event, Optional[EventCallback]]]) -> bool:
+        """Send a batch of events and report the result to their callbacks."""
+        try:
+            # The whole batch is encoded in one orjson call
+            body = orjson.dumps(
+                _to_dicts([event for event, _ in batch]),
+                default=_json_default
+            )
+            headers = None
+            if self._compressor is not None and len(body) >= COMPRESS_MIN_BYTES:
+                body = self._compressor.compress(body)
+                headers = _ZSTD_HEADERS
+            async with self._session.post(
+                self._batch_url, data=body, headers=headers
+            ) as response:
+                success = response.status == 200
+
+            if success:
+                logger.info("Batch sent successfully: %d events", len(batch))
+            else:
+                logger.error("Failed to send batch: %d", response.status)
+
+        except aiohttp.ClientError as e:
+            logger.error("Request failed: %s", e)
+            success = False
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+            success = False
+
+        for event, callback in batch:
+            if callback is not None:
+                try:
+                    callback(event, success)
+                except Exception as e:
+                    logger.error("Event callback failed: %s", e)
+
+        if success:
+            # Sent and reported, so pooled events can be reused
+            for event, _ in batch:
+                pool = getattr(event, '_pool', None)
+                if pool is not None:
+                    pool.release(event)
+
+        return success
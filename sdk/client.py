@@ -2,18 +2,37 @@
 HTTP client for sending events to the analytics API.
 """
 
-import requests
 import logging
+import queue
+import threading
+import urllib3
 from typing import Union
+from urllib.parse import urlsplit
 from .events import InstallEvent, PurchaseEvent
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections kept open to the API
+MAX_POOL_CONNECTIONS = 32
+
+# Events waiting for the background sender before new ones are dropped
+MAX_QUEUED_EVENTS = 10_000
+
+# Queue marker telling the background sender to exit
+_STOP = object()
+
 
 class GameAnalyticsClient:
     """Client for sending game events to the analytics API."""
     
-    def __init__(self, base_url: str, api_key: str, timeout: int = 30):
+    # Single-event endpoint path for each event class
+    _ENDPOINTS = {
+        InstallEvent: '/events/install',
+        PurchaseEvent: '/events/purchase',
+    }
+    
+    def __init__(self, base_url: str, api_key: str, timeout: int = 30,
+                 background: bool = False):
         """
         Initialize the client.
         
@@ -21,17 +40,46 @@ class GameAnalyticsClient:
             base_url: API base URL
             api_key: API key for authentication
             timeout: Request timeout in seconds
+            background: Queue events and send them from a worker thread
+                instead of blocking the caller on each request
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.timeout = timeout
         
-        # Setup session with headers
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        })
+        # Keep-alive connection pool for the API host; each send is a single
+        # urlopen call with no per-request session or header merging
+        self.pool = urllib3.connection_from_url(
+            self.base_url,
+            maxsize=MAX_POOL_CONNECTIONS,
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.api_key}'
+            },
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False
+        )
+        
+        # Endpoint paths on the pool's host, resolved once
+        base_path = urlsplit(self.base_url).path
+        self._url_for_type = {
+            event_type: base_path + path for event_type, path in self._ENDPOINTS.items()
+        }
+        self._health_url = f"{base_path}/health"
+        
+        # Fire-and-forget mode: send_* only enqueue, a daemon thread sends
+        self._queue = None
+        self._worker = None
+        self._closed = False
+        # Makes the closed check and the enqueue one step, so no event can be
+        # queued behind the stop marker
+        self._lock = threading.Lock()
+        if background:
+            self._queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+            self._worker = threading.Thread(
+                target=self._drain, name="analytics-sender", daemon=True
+            )
+            self._worker.start()
     
     def send_install_event(self, event: InstallEvent) -> bool:
         """
@@ -41,9 +89,9 @@ class GameAnalyticsClient:
             event: InstallEvent to send
             
         Returns:
-            True if successful, False otherwise
+            True if successful (in background mode, if queued), False otherwise
         """
-        return self._send_event('/events/install', event)
+        return self._dispatch(self._url_for_type[InstallEvent], event)
     
     def send_purchase_event(self, event: PurchaseEvent) -> bool:
         """
@@ -53,39 +101,112 @@ class GameAnalyticsClient:
             event: PurchaseEvent to send
             
         Returns:
-            True if successful, False otherwise
+            True if successful (in background mode, if queued), False otherwise
         """
-        return self._send_event('/events/purchase', event)
+        return self._dispatch(self._url_for_type[PurchaseEvent], event)
     
-    def _send_event(self, endpoint: str, event: Union[InstallEvent, PurchaseEvent]) -> bool:
-        """Send event to API endpoint."""
-        url = f"{self.base_url}{endpoint}"
+    def send(self, event: Union[InstallEvent, PurchaseEvent]) -> bool:
+        """
+        Send an event to the endpoint for its type.
         
+        Args:
+            event: InstallEvent or PurchaseEvent to send
+            
+        Returns:
+            True if successful (in background mode, if queued), False otherwise
+            (including for an event type the API has no endpoint for)
+        """
+        url = self._url_for_type.get(type(event))
+        if url is None:
+            logger.error("Unsupported event type: %s", type(event).__name__)
+            return False
+        return self._dispatch(url, event)
+    
+    def flush(self):
+        """In background mode, wait until every queued event has been sent."""
+        if self._queue is not None:
+            self._queue.join()
+    
+    def close(self):
+        """
+        Send any queued events, stop the background sender and close the
+        connection pool. Events sent after close() are refused.
+        
+        In background mode, call this (or use the client as a context
+        manager) before exiting; the sender is a daemon thread, so events
+        still queued at interpreter exit are lost.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            if worker is not None:
+                # Queued after every pending event, so those are sent first
+                self._queue.put(_STOP)
+        if worker is not None:
+            worker.join()
+            self._worker = None
+        self.pool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _dispatch(self, url: str, event: Union[InstallEvent, PurchaseEvent]) -> bool:
+        """Send event now, or queue it for the background sender."""
+        if self._queue is None:
+            return self._send_event(url, event)
+        with self._lock:
+            if self._closed:
+                logger.warning("Client is closed, dropping event: %s", event.event_id)
+                return False
+            try:
+                self._queue.put_nowait((url, event))
+                return True
+            except queue.Full:
+                # Drop rather than block the caller when the sender falls behind
+                logger.warning("Send queue full, dropping event: %s", event.event_id)
+                return False
+    
+    def _drain(self):
+        """Background sender: send queued events one at a time until stopped."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                url, event = item
+                self._send_event(url, event)
+            finally:
+                self._queue.task_done()
+    
+    def _send_event(self, url: str, event: Union[InstallEvent, PurchaseEvent]) -> bool:
+        """Send event to an API endpoint path."""
         try:
-            response = self.session.post(
-                url,
-                json=event.to_dict(),
-                timeout=self.timeout
-            )
+            # Content-Type and Authorization are the pool's default headers
+            response = self.pool.urlopen('POST', url, body=event.to_json_bytes())
             
-            if response.status_code == 200:
-                logger.info(f"Event sent successfully: {event.event_id}")
+            if response.status == 200:
+                logger.info("Event sent successfully: %s", event.event_id)
                 return True
             else:
-                logger.error(f"Failed to send event: {response.status_code}")
+                logger.error("Failed to send event: %d", response.status)
                 return False
                 
-        except requests.RequestException as e:
-            logger.error(f"Request failed: {e}")
+        except urllib3.exceptions.HTTPError as e:
+            logger.error("Request failed: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
             return False
     
     def health_check(self) -> bool:
         """Check if API is healthy."""
         try:
-            response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
-            return response.status_code == 200
+            response = self.pool.urlopen('GET', self._health_url)
+            return response.status == 200
         except Exception:
             return False
\ No newline at end of file
@@ -2,23 +2,82 @@
 Event data models for the game analytics SDK.
 """
 
-import uuid
+import os
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from decimal import Decimal
+from operator import attrgetter
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Union
+
+import orjson
+
+if TYPE_CHECKING:
+    from .pool import EventPool
+
+
+# (epoch milliseconds, ISO timestamp) of the last _format_timestamp() call;
+# swapped as one tuple so threads never see a mismatched pair
+_TS_CACHE = [(0, '')]
+
+
+def _format_timestamp(ts_ns: int) -> str:
+    """Epoch nanoseconds as a UTC ISO 8601 string, reusing the last result within a millisecond."""
+    ms = ts_ns // 1_000_000
+    cached_ms, ts = _TS_CACHE[0]
+    if ms == cached_ms:
+        return ts
+    ts = datetime.utcfromtimestamp(ms / 1000).isoformat(timespec='milliseconds')
+    _TS_CACHE[0] = (ms, ts)
+    return ts
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize types orjson doesn't handle natively."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
 
 
 class BaseEvent:
     """Base class for all events."""
     
+    # _pool is set on instances handed out by an EventPool. Field types are
+    # Optional because EventPool.release() clears every slot to None.
+    __slots__ = ('event_id', 'user_id', 'game_id', 'platform', 'app_version',
+                 'session_id', '_ts_ns', '_pool')
+    
+    event_id: Optional[str]
+    user_id: Optional[str]
+    game_id: Optional[str]
+    platform: Optional[str]
+    app_version: Optional[str]
+    session_id: Optional[str]
+    _ts_ns: Optional[int]
+    _pool: Optional['EventPool']
+    
     def __init__(self, user_id: str, game_id: str, platform: str, 
                  app_version: str, session_id: str):
-        self.event_id = str(uuid.uuid4())
+        # 128 random bits, hex-encoded; cheaper than building a uuid4
+        self.event_id = os.urandom(16).hex()
         self.user_id = user_id
         self.game_id = game_id
         self.platform = platform
         self.app_version = app_version
         self.session_id = session_id
-        self.timestamp = datetime.utcnow().isoformat()
+        # Creation time; formatted only when the event is serialized
+        self._ts_ns = time.time_ns()
+    
+    @property
+    def timestamp(self) -> str:
+        """Creation time as a UTC ISO 8601 string at millisecond precision."""
+        return _format_timestamp(self._ts_ns)
+    
+    @classmethod
+    def acquire(cls, pool: 'EventPool', **fields: Any) -> 'BaseEvent':
+        """Create an event from pool, reusing a released instance when one is free."""
+        if pool.cls is not cls:
+            raise TypeError(f"pool holds {pool.cls.__name__}, not {cls.__name__}")
+        return pool.acquire(**fields)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert event to dictionary."""
@@ -31,11 +90,28 @@ class BaseEvent:
             'session_id': self.session_id,
             'timestamp': self.timestamp
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize event as compact JSON."""
+        return orjson.dumps(self.to_dict(), default=_json_default)
 
 
 class InstallEvent(BaseEvent):
     """Install event sent when user installs the game."""
     
+    __slots__ = ('event_type', 'source', 'country')
+    
+    event_type: Optional[str]
+    source: Optional[str]
+    country: Optional[str]
+    
+    # Class-invariant part of to_json_bytes(), serialized once
+    _JSON_PREFIX = b'{"event_type":"install",'
+    # to_dict() keys, and a getter fetching their values in one call
+    _FIELDS = ('event_id', 'user_id', 'game_id', 'platform', 'app_version',
+               'session_id', 'timestamp', 'event_type', 'source', 'country')
+    _get_fields = attrgetter(*_FIELDS)
+    
     def __init__(self, user_id: str, game_id: str, platform: str, 
                  app_version: str, session_id: str,
                  source: Optional[str] = None, country: Optional[str] = None):
@@ -45,21 +121,68 @@ class InstallEvent(BaseEvent):
         self.country = country
     
     def to_dict(self) -> Dict[str, Any]:
-        data = super().to_dict()
-        data.update({
+        # Built as one literal rather than extending BaseEvent.to_dict()
+        return {
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'platform': self.platform,
+            'app_version': self.app_version,
+            'session_id': self.session_id,
+            'timestamp': self.timestamp,
             'event_type': self.event_type,
             'source': self.source,
             'country': self.country
-        })
-        return data
+        }
+    
+    @staticmethod
+    def to_dicts(events: List['InstallEvent']) -> List[Dict[str, Any]]:
+        """Convert many install events to dictionaries, as to_dict() would."""
+        fields, get_fields = InstallEvent._FIELDS, InstallEvent._get_fields
+        return [dict(zip(fields, get_fields(event))) for event in events]
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize event as compact JSON, encoding only the per-event fields."""
+        return self._JSON_PREFIX + orjson.dumps({
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'platform': self.platform,
+            'app_version': self.app_version,
+            'session_id': self.session_id,
+            'timestamp': self.timestamp,
+            'source': self.source,
+            'country': self.country
+        })[1:]
 
 
 class PurchaseEvent(BaseEvent):
     """Purchase event sent when user makes a purchase."""
     
+    __slots__ = ('event_type', 'product_id', 'product_name', 'price', 'currency',
+                 'quantity', 'store', 'transaction_id')
+    
+    event_type: Optional[str]
+    product_id: Optional[str]
+    product_name: Optional[str]
+    price: Optional[Union[float, Decimal]]
+    currency: Optional[str]
+    quantity: Optional[int]
+    store: Optional[str]
+    transaction_id: Optional[str]
+    
+    # Class-invariant part of to_json_bytes(), serialized once
+    _JSON_PREFIX = b'{"event_type":"purchase",'
+    # to_dict() keys, and a getter fetching their values in one call
+    _FIELDS = ('event_id', 'user_id', 'game_id', 'platform', 'app_version',
+               'session_id', 'timestamp', 'event_type', 'product_id',
+               'product_name', 'price', 'currency', 'quantity', 'store',
+               'transaction_id')
+    _get_fields = attrgetter(*_FIELDS)
+    
     def __init__(self, user_id: str, game_id: str, platform: str,
                  app_version: str, session_id: str,
-                 product_id: str, product_name: str, price: float, currency: str,
+                 product_id: str, product_name: str, price: Union[float, Decimal], currency: str,
                  quantity: int = 1, store: Optional[str] = None):
         super().__init__(user_id, game_id, platform, app_version, session_id)
         self.event_type = "purchase"
@@ -71,17 +194,30 @@ class PurchaseEvent(BaseEvent):
         self.store = store
         self.transaction_id = f"txn_{self.event_id}"
         
-        # Basic validation
-        if not product_id:
+        # Checked on construction only when assertions are enabled; optimized
+        # builds (python -O) leave it to callers that don't already trust inputs
+        if __debug__:
+            self.validate()
+    
+    def validate(self) -> None:
+        """Basic validation; raises ValueError for an invalid purchase."""
+        if not self.product_id:
             raise ValueError("product_id is required")
-        if price < 0:
+        if self.price < 0:
             raise ValueError("price cannot be negative")
-        if quantity <= 0:
+        if self.quantity <= 0:
             raise ValueError("quantity must be positive")
     
     def to_dict(self) -> Dict[str, Any]:
-        data = super().to_dict()
-        data.update({
+        # Built as one literal rather than extending BaseEvent.to_dict()
+        return {
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'platform': self.platform,
+            'app_version': self.app_version,
+            'session_id': self.session_id,
+            'timestamp': self.timestamp,
             'event_type': self.event_type,
             'product_id': self.product_id,
             'product_name': self.product_name,
@@ -90,5 +226,29 @@ class PurchaseEvent(BaseEvent):
             'quantity': self.quantity,
             'store': self.store,
             'transaction_id': self.transaction_id
-        })
-        return data
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def to_dicts(events: List['PurchaseEvent']) -> List[Dict[str, Any]]:
+        """Convert many purchase events to dictionaries, as to_dict() would."""
+        fields, get_fields = PurchaseEvent._FIELDS, PurchaseEvent._get_fields
+        return [dict(zip(fields, get_fields(event))) for event in events]
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize event as compact JSON, encoding only the per-event fields."""
+        return self._JSON_PREFIX + orjson.dumps({
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'platform': self.platform,
+            'app_version': self.app_version,
+            'session_id': self.session_id,
+            'timestamp': self.timestamp,
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'price': self.price,
+            'currency': self.currency,
+            'quantity': self.quantity,
+            'store': self.store,
+            'transaction_id': self.transaction_id
+        }, default=_json_default)[1:]
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Reusable event instances for high-throughput emitters.
+"""
+
+from collections import deque
+from typing import Any, Tuple, Type
+
+
+class EventPool:
+    """Pool of pre-allocated event instances of one class.
+
+    acquire() hands out an instance initialised with the given fields and
+    release() clears it and puts it back. Both are safe to call from several
+    threads, since deque append/pop are atomic.
+    """
+
+    def __init__(self, cls: Type, size: int):
+        """
+        Initialize the pool.
+
+        Args:
+            cls: Event class to pool (InstallEvent or PurchaseEvent)
+            size: Number of instances pre-allocated and kept for reuse
+        """
+        self.cls = cls
+        self.size = size
+        self._free = deque((cls.__new__(cls) for _ in range(size)), maxlen=size)
+        # Every slot on the class and its bases, cleared on release
+        self._slots: Tuple[str, ...] = tuple(
+            name for klass in cls.__mro__ for name in getattr(klass, '__slots__', ())
+        )
+
+    def acquire(self, **fields: Any):
+        """Take an instance from the pool, or allocate one if the pool is empty."""
+        try:
+            event = self._free.pop()
+        except IndexError:
+            event = self.cls.__new__(self.cls)
+        event.__init__(**fields)
+        event._pool = self
+        return event
+
+    def release(self, event) -> None:
+        """Clear an acquired event and return it to the pool.
+
+        The event must not be used after it is released.
+        """
+        if getattr(event, '_pool', None) is not self:
+            return
+        for name in self._slots:
+            setattr(event, name, None)
+        # A full pool drops its oldest spare instance
+        self._free.append(event)
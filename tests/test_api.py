@@ -2,6 +2,7 @@
 Tests for the Game Analytics API.
 """
 
+import json
 import pytest
 from datetime import datetime
 from fastapi.testclient import TestClient
@@ -13,9 +14,15 @@ class TestAPI:
     
     def setup_method(self):
         """Setup test fixtures."""
+        # Entered so the lifespan creates the event queue and flusher
         self.client = TestClient(app)
+        self.client.__enter__()
         self.headers = {"Authorization": "Bearer your-api-key-here"}
     
+    def teardown_method(self):
+        """Stop the app started in setup_method."""
+        self.client.__exit__(None, None, None)
+    
     def test_root_endpoint(self):
         """Test root endpoint."""
         response = self.client.get("/")
@@ -149,6 +156,127 @@ class TestAPI:
         )
         
         assert response.status_code == 422  # Validation error
+    
+    def test_unknown_field_rejected(self):
+        """Test events with unknown fields are rejected."""
+        event_data = {
+            "event_id": "evt_123",
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123",
+            "unexpected": "value"
+        }
+        
+        response = self.client.post(
+            "/events/install",
+            json=event_data,
+            headers=self.headers
+        )
+        
+        assert response.status_code == 422  # Validation error
+    
+    def test_batch_events_success(self):
+        """Test successful batch submission."""
+        install = {
+            "event_id": "evt_1",
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123"
+        }
+        purchase = {
+            **install,
+            "event_id": "evt_2",
+            "product_id": "coins100",
+            "product_name": "100 Coins",
+            "price": 0.99,
+            "currency": "USD"
+        }
+        
+        response = self.client.post(
+            "/events/batch",
+            json=[install, purchase],
+            headers=self.headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["accepted_events"] == 2
+    
+    def test_batch_zstd_encoded(self):
+        """Test a zstd-compressed batch is decompressed before validation."""
+        zstandard = pytest.importorskip("zstandard")
+        install = {
+            "event_id": "evt_1",
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123"
+        }
+        body = zstandard.ZstdCompressor().compress(json.dumps([install] * 3).encode())
+        
+        response = self.client.post(
+            "/events/batch",
+            content=body,
+            headers={**self.headers, "Content-Encoding": "zstd"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["accepted_events"] == 3
+    
+    def test_batch_zstd_multiple_frames(self):
+        """Test a zstd body made of several concatenated frames is read in full."""
+        zstandard = pytest.importorskip("zstandard")
+        install = {
+            "event_id": "evt_1",
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123"
+        }
+        payload = json.dumps([install] * 3).encode()
+        compressor = zstandard.ZstdCompressor()
+        half = len(payload) // 2
+        body = compressor.compress(payload[:half]) + compressor.compress(payload[half:])
+        
+        response = self.client.post(
+            "/events/batch",
+            content=body,
+            headers={**self.headers, "Content-Encoding": "zstd"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["accepted_events"] == 3
+    
+    def test_batch_validation(self):
+        """Test batch size and event validation."""
+        response = self.client.post("/events/batch", json=[], headers=self.headers)
+        assert response.status_code == 400
+        
+        response = self.client.post(
+            "/events/batch",
+            json=[{"event_id": "evt_1"}] * 501,
+            headers=self.headers
+        )
+        assert response.status_code == 400
+        
+        # Invalid event - missing required fields
+        response = self.client.post(
+            "/events/batch",
+            json=[{"event_id": "evt_1"}],
+            headers=self.headers
+        )
+        assert response.status_code == 422
 
 
 class TestFirehoseIntegration:
@@ -158,7 +286,7 @@ class TestFirehoseIntegration:
         """Test mock Firehose client."""
         from api.firehose_client import MockFirehoseClient
         
-        client = MockFirehoseClient()
+        client = MockFirehoseClient(record=True)
         
         # Test sending event
         event_data = {"event_id": "test_123", "user_id": "user_123"}
@@ -171,4 +299,188 @@ class TestFirehoseIntegration:
         # Check sent events
         sent_events = client.get_sent_events()
         assert len(sent_events) == 1
-        assert sent_events[0]["event_id"] == "test_123"
\ No newline at end of file
+        assert sent_events[0]["event_id"] == "test_123"
+        
+        # Events are not kept unless recording is enabled
+        client = MockFirehoseClient(record=False)
+        client.send_event(event_data)
+        assert client.get_sent_events() == []
+    
+    def test_events_flushed_on_shutdown(self):
+        """Test queued events are flushed to Firehose when the app stops."""
+        from unittest.mock import patch
+        from api.main import firehose_client
+        
+        event_data = {
+            "event_id": "evt_flush",
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123"
+        }
+        
+        with patch.object(firehose_client.client, "record", True):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/events/install",
+                    json=event_data,
+                    headers={"Authorization": "Bearer your-api-key-here"}
+                )
+                assert response.status_code == 200
+        
+        sent_ids = [e["event_id"] for e in firehose_client.client.get_sent_events()]
+        assert "evt_flush" in sent_ids
+    
+    def test_events_flushed_across_restarts(self):
+        """Test the app keeps flushing events after being restarted in-process."""
+        from unittest.mock import patch
+        from api.main import firehose_client
+        
+        event_data = {
+            "user_id": "user_123",
+            "game_id": "test_game",
+            "timestamp": datetime.utcnow().isoformat(),
+            "platform": "ios",
+            "app_version": "1.0.0",
+            "session_id": "session_123"
+        }
+        
+        with patch.object(firehose_client.client, "record", True):
+            for event_id in ("evt_run_1", "evt_run_2"):
+                with TestClient(app) as client:
+                    response = client.post(
+                        "/events/install",
+                        json={**event_data, "event_id": event_id},
+                        headers={"Authorization": "Bearer your-api-key-here"}
+                    )
+                    assert response.status_code == 200
+        
+        sent_ids = [e["event_id"] for e in firehose_client.client.get_sent_events()]
+        assert {"evt_run_1", "evt_run_2"} <= set(sent_ids)
+    
+    def test_batch_records_are_packed(self):
+        """Test batched events are packed into newline-delimited records."""
+        from unittest.mock import Mock
+        from api.firehose_client import FirehoseClient, MAX_RECORD_BYTES
+        
+        client = FirehoseClient("test-stream", use_mock=True)
+        client.client = Mock(spec=["put_record_batch"])
+        client.client.put_record_batch.return_value = {"FailedPutCount": 0}
+        
+        small = [{"event_id": f"evt_{i}"} for i in range(3)]
+        large = [{"event_id": f"big_{i}", "payload": "x" * (MAX_RECORD_BYTES // 2)} for i in range(3)]
+        
+        assert client.send_events_batch(small + large) is True
+        records = client.client.put_record_batch.call_args.kwargs["Records"]
+        
+        assert len(records) == 3
+        assert all(len(r["Data"]) <= MAX_RECORD_BYTES for r in records)
+        lines = b"".join(r["Data"] for r in records).splitlines()
+        assert [json.loads(line)["event_id"] for line in lines] == [
+            "evt_0", "evt_1", "evt_2", "big_0", "big_1", "big_2"
+        ]
+    
+    def test_batch_records_include_metadata(self):
+        """Test packed records carry the ingestion metadata."""
+        from unittest.mock import Mock
+        from api.firehose_client import FirehoseClient, SOURCE
+        
+        client = FirehoseClient("test-stream", use_mock=True)
+        client.client = Mock(spec=["put_record_batch"])
+        client.client.put_record_batch.return_value = {"FailedPutCount": 0}
+        
+        events = [{"event_id": "evt_1"}, {"event_id": "evt_2", "source": "organic"}]
+        assert client.send_events_batch(events) is True
+        records = client.client.put_record_batch.call_args.kwargs["Records"]
+        first, second = [json.loads(line) for line in records[0]["Data"].splitlines()]
+        
+        assert first["source"] == SOURCE
+        assert "ingestion_timestamp" in first
+        assert second["source"] == "organic"
+        assert second["ingestion_timestamp"] == first["ingestion_timestamp"]
+        assert records[0]["Data"].count(b'"source"') == 2
+    
+    def test_batch_records_nested_source(self):
+        """Test a nested 'source' key doesn't replace the record's own metadata."""
+        from unittest.mock import Mock
+        from api.firehose_client import FirehoseClient, SOURCE
+        
+        client = FirehoseClient("test-stream", use_mock=True)
+        client.client = Mock(spec=["put_record_batch"])
+        client.client.put_record_batch.return_value = {"FailedPutCount": 0}
+        
+        events = [{"event_id": "evt_1", "meta": {"source": "x"}}]
+        assert client.send_events_batch(events) is True
+        records = client.client.put_record_batch.call_args.kwargs["Records"]
+        record = json.loads(records[0]["Data"])
+        
+        assert record["source"] == SOURCE
+        assert record["meta"] == {"source": "x"}
+    
+    def test_dead_letter_queue_is_bounded(self):
+        """Test DLQ drops the oldest events when full."""
+        from api.firehose_client import DeadLetterQueue
+        
+        dlq = DeadLetterQueue(max_size=2)
+        for i in range(3):
+            dlq.add_failed_event({"event_id": f"evt_{i}"}, "error")
+        
+        assert [f["event"]["event_id"] for f in dlq.failed_events] == ["evt_1", "evt_2"]
+    
+    def test_batch_send_retries_aws_errors(self):
+        """Test AWS errors are retried before the batch fails."""
+        from unittest.mock import Mock, patch
+        from botocore.exceptions import ClientError
+        from api.firehose_client import FirehoseClient, MAX_ATTEMPTS
+        
+        client = FirehoseClient("test-stream", use_mock=True)
+        client.client = Mock(spec=["put_record_batch"])
+        error = ClientError({"Error": {"Code": "ServiceUnavailableException"}}, "PutRecordBatch")
+        client.client.put_record_batch.side_effect = [error, {"FailedPutCount": 0}]
+        
+        with patch("api.firehose_client.time.sleep"):
+            assert client.send_events_batch([{"event_id": "evt_1"}]) is True
+        assert client.client.put_record_batch.call_count == 2
+        
+        # Exhausted retries end up in the DLQ
+        client.client.put_record_batch.side_effect = error
+        with patch("api.firehose_client.time.sleep"):
+            assert client.send_events_batch([{"event_id": "evt_2"}]) is False
+        assert client.client.put_record_batch.call_count == 2 + MAX_ATTEMPTS
+        assert client.dlq.failed_events[-1]["event"]["event_id"] == "evt_2"
+    
+    def test_batch_records_compressed(self):
+        """Test packed records are gzipped when compression is enabled."""
+        import gzip
+        from unittest.mock import Mock
+        from api.firehose_client import FirehoseClient
+        
+        client = FirehoseClient("test-stream", use_mock=True, compress=True)
+        client.client = Mock(spec=["put_record_batch"])
+        client.client.put_record_batch.return_value = {"FailedPutCount": 0}
+        
+        events = [{"event_id": f"evt_{i}"} for i in range(3)]
+        assert client.send_events_batch(events) is True
+        records = client.client.put_record_batch.call_args.kwargs["Records"]
+        
+        lines = gzip.decompress(b"".join(r["Data"] for r in records)).splitlines()
+        assert [json.loads(line)["event_id"] for line in lines] == ["evt_0", "evt_1", "evt_2"]
+    
+    def test_pack_buffer_reused_across_batches(self):
+        """Test the packing buffer grows for large events and is safely reused."""
+        from unittest.mock import Mock
+        from api.firehose_client import FirehoseClient, PACK_BUFFER_BYTES
+        
+        client = FirehoseClient("test-stream", use_mock=True)
+        client.client = Mock(spec=["put_record_batch"])
+        client.client.put_record_batch.return_value = {"FailedPutCount": 0}
+        
+        huge = {"event_id": "huge", "payload": "x" * (2 * PACK_BUFFER_BYTES)}
+        assert client.send_events_batch([huge]) is True
+        assert client.send_events_batch([{"event_id": "small"}]) is True
+        
+        first, second = [c.kwargs["Records"] for c in client.client.put_record_batch.call_args_list]
+        assert json.loads(first[0]["Data"])["payload"] == huge["payload"]
+        assert [json.loads(line)["event_id"] for line in second[0]["Data"].splitlines()] == ["small"]
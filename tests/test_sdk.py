@@ -2,10 +2,16 @@
 Tests for the Game Analytics SDK.
 """
 
+import asyncio
+import threading
+import orjson
 import pytest
+from decimal import Decimal
 from unittest.mock import Mock, patch
 from sdk.events import InstallEvent, PurchaseEvent
 from sdk.client import GameAnalyticsClient
+from sdk.async_client import AsyncGameAnalyticsClient
+from sdk.pool import EventPool
 
 
 class TestEvents:
@@ -26,7 +32,24 @@ class TestEvents:
         assert event.user_id == "user123"
         assert event.event_type == "install"
         assert event.source == "organic"
-        assert event.event_id is not None
+        assert len(event.event_id) == 32
+        int(event.event_id, 16)
+        # Millisecond precision, e.g. 2024-01-01T12:00:00.123
+        assert len(event.timestamp) == 23
+    
+    def test_events_use_slots(self):
+        """Test events don't carry a per-instance __dict__."""
+        event = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        
+        assert not hasattr(event, '__dict__')
+        with pytest.raises(AttributeError):
+            event.unknown_field = "value"
     
     def test_install_event_to_dict(self):
         """Test converting install event to dict."""
@@ -61,35 +84,126 @@ class TestEvents:
         assert event.price == 0.99
         assert event.event_type == "purchase"
     
+    def test_purchase_event_to_dict(self):
+        """Test converting purchase event to dict."""
+        event = PurchaseEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            product_id="coins100",
+            product_name="100 Coins",
+            price=0.99,
+            currency="USD"
+        )
+        
+        data = event.to_dict()
+        assert data['event_id'] == event.event_id
+        assert data['session_id'] == "session123"
+        assert data['event_type'] == "purchase"
+        assert data['price'] == 0.99
+        assert data['transaction_id'] == f"txn_{event.event_id}"
+        assert 'timestamp' in data
+    
+    def test_to_json_bytes_matches_to_dict(self):
+        """Test to_json_bytes encodes the same fields as to_dict."""
+        install = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            country="US"
+        )
+        purchase = PurchaseEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            product_id="coins100",
+            product_name="100 Coins",
+            price=Decimal("0.99"),
+            currency="USD"
+        )
+        
+        assert orjson.loads(install.to_json_bytes()) == install.to_dict()
+        assert orjson.loads(purchase.to_json_bytes()) == {**purchase.to_dict(), "price": "0.99"}
+    
+    def test_to_dicts_matches_to_dict(self):
+        """Test to_dicts converts events as to_dict does."""
+        events = [
+            InstallEvent(
+                user_id=f"user{i}",
+                game_id="game1",
+                platform="ios",
+                app_version="1.0.0",
+                session_id="session123"
+            )
+            for i in range(3)
+        ]
+        
+        assert InstallEvent.to_dicts(events) == [event.to_dict() for event in events]
+    
     def test_purchase_event_validation(self):
         """Test purchase event validation."""
+        event = PurchaseEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            product_id="coins100",
+            product_name="100 Coins",
+            price=0.99,
+            currency="USD"
+        )
+        event.validate()
+        
         # Test empty product_id
+        event.product_id = ""
         with pytest.raises(ValueError, match="product_id is required"):
-            PurchaseEvent(
-                user_id="user123",
-                game_id="game1",
-                platform="ios",
-                app_version="1.0.0", 
-                session_id="session123",
-                product_id="",
-                product_name="100 Coins",
-                price=0.99,
-                currency="USD"
-            )
+            event.validate()
         
         # Test negative price
+        event.product_id = "coins100"
+        event.price = -1.0
         with pytest.raises(ValueError, match="price cannot be negative"):
-            PurchaseEvent(
-                user_id="user123",
-                game_id="game1",
-                platform="ios",
-                app_version="1.0.0",
-                session_id="session123", 
-                product_id="coins100",
-                product_name="100 Coins",
-                price=-1.0,
-                currency="USD"
-            )
+            event.validate()
+        
+        # Test non-positive quantity
+        event.price = 0.99
+        event.quantity = 0
+        with pytest.raises(ValueError, match="quantity must be positive"):
+            event.validate()
+
+
+class TestEventPool:
+    """Test EventPool."""
+    
+    def test_released_event_is_reused(self):
+        """Test a released event is cleared and handed out again."""
+        pool = EventPool(InstallEvent, size=1)
+        fields = dict(user_id="user123", game_id="game1", platform="ios",
+                      app_version="1.0.0", session_id="session123")
+        
+        event = InstallEvent.acquire(pool, source="organic", **fields)
+        assert event.source == "organic"
+        assert event.event_type == "install"
+        
+        pool.release(event)
+        assert event.user_id is None
+        
+        reused = InstallEvent.acquire(pool, **fields)
+        assert reused is event
+        assert reused.user_id == "user123"
+        assert reused.source is None
+    
+    def test_acquire_checks_pool_class(self):
+        """Test acquiring from a pool of another event class fails."""
+        with pytest.raises(TypeError):
+            PurchaseEvent.acquire(EventPool(InstallEvent, size=1))
 
 
 class TestClient:
@@ -107,12 +221,12 @@ class TestClient:
         assert self.client.base_url == "https://test-api.com"
         assert self.client.api_key == "test-key"
     
-    @patch('sdk.client.requests.Session.post')
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
     def test_send_install_event_success(self, mock_post):
         """Test successful install event sending."""
         # Mock successful response
         mock_response = Mock()
-        mock_response.status_code = 200
+        mock_response.status = 200
         mock_post.return_value = mock_response
         
         # Create and send event
@@ -128,12 +242,12 @@ class TestClient:
         assert result is True
         mock_post.assert_called_once()
     
-    @patch('sdk.client.requests.Session.post')
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
     def test_send_purchase_event_success(self, mock_post):
         """Test successful purchase event sending."""
         # Mock successful response
         mock_response = Mock()
-        mock_response.status_code = 200
+        mock_response.status = 200
         mock_post.return_value = mock_response
         
         # Create and send event
@@ -152,13 +266,50 @@ class TestClient:
         result = self.client.send_purchase_event(event)
         assert result is True
         mock_post.assert_called_once()
+        assert mock_post.call_args.args[:2] == ("POST", "/events/purchase")
+        assert orjson.loads(mock_post.call_args.kwargs["body"]) == event.to_dict()
+    
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
+    def test_send_routes_by_event_type(self, mock_post):
+        """Test send posts each event to the endpoint for its type."""
+        mock_response = Mock()
+        mock_response.status = 200
+        mock_post.return_value = mock_response
+        
+        event = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        
+        assert self.client.send(event) is True
+        assert mock_post.call_args.args[:2] == ("POST", "/events/install")
+    
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
+    def test_send_unsupported_event_type(self, mock_post):
+        """Test send rejects event types without an endpoint."""
+        class CustomEvent(InstallEvent):
+            __slots__ = ()
+        
+        event = CustomEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        
+        assert self.client.send(event) is False
+        mock_post.assert_not_called()
     
-    @patch('sdk.client.requests.Session.post')
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
     def test_send_event_failure(self, mock_post):
         """Test failed event sending."""
         # Mock failed response
         mock_response = Mock()
-        mock_response.status_code = 500
+        mock_response.status = 500
         mock_post.return_value = mock_response
         
         event = InstallEvent(
@@ -172,14 +323,287 @@ class TestClient:
         result = self.client.send_install_event(event)
         assert result is False
     
-    @patch('sdk.client.requests.Session.get')
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
+    def test_background_send(self, mock_post):
+        """Test background mode queues events and sends them on flush."""
+        mock_response = Mock()
+        mock_response.status = 200
+        mock_post.return_value = mock_response
+        client = GameAnalyticsClient(
+            base_url="https://test-api.com",
+            api_key="test-key",
+            background=True
+        )
+        
+        event = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        
+        assert client.send_install_event(event) is True
+        assert client.send_install_event(event) is True
+        client.flush()
+        assert mock_post.call_count == 2
+    
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
+    def test_background_close_sends_queued_events(self, mock_post):
+        """Test closing a background client sends queued events and stops the sender."""
+        mock_response = Mock()
+        mock_response.status = 200
+        mock_post.return_value = mock_response
+        event = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        
+        with GameAnalyticsClient(
+            base_url="https://test-api.com",
+            api_key="test-key",
+            background=True
+        ) as client:
+            worker = client._worker
+            assert client.send_install_event(event) is True
+        
+        assert mock_post.call_count == 1
+        assert not worker.is_alive()
+        assert client.send_install_event(event) is False
+    
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
+    def test_background_close_races_with_senders(self, mock_post):
+        """Test every event accepted while another thread closes the client is sent."""
+        mock_response = Mock()
+        mock_response.status = 200
+        mock_post.return_value = mock_response
+        event = InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+        client = GameAnalyticsClient(
+            base_url="https://test-api.com",
+            api_key="test-key",
+            background=True
+        )
+        accepted = []
+        
+        def send_many():
+            accepted.append(sum(client.send_install_event(event) for _ in range(500)))
+        
+        senders = [threading.Thread(target=send_many) for _ in range(4)]
+        for sender in senders:
+            sender.start()
+        client.close()
+        for sender in senders:
+            sender.join()
+        
+        assert mock_post.call_count == sum(accepted)
+    
+    @patch('sdk.client.urllib3.HTTPConnectionPool.urlopen')
     def test_health_check(self, mock_get):
         """Test health check."""
         # Mock successful health check
         mock_response = Mock()
-        mock_response.status_code = 200
+        mock_response.status = 200
         mock_get.return_value = mock_response
         
         result = self.client.health_check()
         assert result is True
-        mock_get.assert_called_with("https://test-api.com/health", timeout=30)
\ No newline at end of file
+        mock_get.assert_called_with("GET", "/health")
+
+
+class TestAsyncClient:
+    """Test AsyncGameAnalyticsClient."""
+    
+    def _install_event(self):
+        return InstallEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123"
+        )
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_events_sent_as_one_batch(self, mock_post):
+        """Test queued events are sent in a single batch request."""
+        mock_post.return_value.__aenter__.return_value.status = 200
+        results = []
+        
+        async def run():
+            async with AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key",
+                max_wait_ms=50
+            ) as client:
+                for _ in range(3):
+                    await client.send_install_event(
+                        self._install_event(),
+                        callback=lambda event, ok: results.append(ok)
+                    )
+        
+        asyncio.run(run())
+        
+        mock_post.assert_called_once()
+        assert mock_post.call_args.args[0] == "https://test-api.com/events/batch"
+        assert len(orjson.loads(mock_post.call_args.kwargs["data"])) == 3
+        assert results == [True, True, True]
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_mixed_batch_keeps_order(self, mock_post):
+        """Test a batch of mixed event types is sent in the order queued."""
+        mock_post.return_value.__aenter__.return_value.status = 200
+        purchase = PurchaseEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            product_id="coins100",
+            product_name="100 Coins",
+            price=0.99,
+            currency="USD"
+        )
+        events = [self._install_event(), purchase, self._install_event()]
+        
+        async def run():
+            async with AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key"
+            ) as client:
+                await client.send_install_event(events[0])
+                await client.send_purchase_event(events[1])
+                await client.send_install_event(events[2])
+        
+        asyncio.run(run())
+        
+        sent = orjson.loads(mock_post.call_args.kwargs["data"])
+        assert [e["event_id"] for e in sent] == [e.event_id for e in events]
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_pooled_events_released_after_send(self, mock_post):
+        """Test pooled events go back to their pool once their batch is sent."""
+        mock_post.return_value.__aenter__.return_value.status = 200
+        pool = EventPool(InstallEvent, size=1)
+        
+        async def run():
+            async with AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key"
+            ) as client:
+                event = InstallEvent.acquire(
+                    pool, user_id="user123", game_id="game1", platform="ios",
+                    app_version="1.0.0", session_id="session123"
+                )
+                await client.send_install_event(event)
+                await client.flush()
+                return event
+        
+        event = asyncio.run(run())
+        
+        assert orjson.loads(mock_post.call_args.kwargs["data"])[0]["user_id"] == "user123"
+        assert event.user_id is None
+        assert list(pool._free) == [event]
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_send_events_concurrently(self, mock_post):
+        """Test send_events posts each event to its own endpoint."""
+        mock_post.return_value.__aenter__.return_value.status = 200
+        purchase = PurchaseEvent(
+            user_id="user123",
+            game_id="game1",
+            platform="ios",
+            app_version="1.0.0",
+            session_id="session123",
+            product_id="coins100",
+            product_name="100 Coins",
+            price=0.99,
+            currency="USD"
+        )
+        
+        async def run():
+            async with AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key"
+            ) as client:
+                return await client.send_events([self._install_event(), purchase])
+        
+        assert asyncio.run(run()) == [True, True]
+        assert sorted(c.args[0] for c in mock_post.call_args_list) == [
+            "https://test-api.com/events/install",
+            "https://test-api.com/events/purchase",
+        ]
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_large_batches_compressed(self, mock_post):
+        """Test batches over COMPRESS_MIN_BYTES are sent zstd-compressed."""
+        zstandard = pytest.importorskip("zstandard")
+        mock_post.return_value.__aenter__.return_value.status = 200
+        
+        async def run():
+            async with AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key",
+                compress=True
+            ) as client:
+                for _ in range(50):
+                    await client.send_install_event(self._install_event())
+        
+        asyncio.run(run())
+        
+        kwargs = mock_post.call_args.kwargs
+        assert kwargs["headers"] == {"Content-Encoding": "zstd"}
+        body = zstandard.ZstdDecompressor().decompress(kwargs["data"])
+        assert len(orjson.loads(body)) == 50
+    
+    def test_queue_is_bounded(self):
+        """Test producers wait once max_queue events are queued."""
+        async def run():
+            client = AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key",
+                max_queue=2
+            )
+            await client.start()
+            # Stop the flush loop so nothing is taken off the queue
+            client._flush_task.cancel()
+            await client.send_install_event(self._install_event())
+            await client.send_install_event(self._install_event())
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    client.send_install_event(self._install_event()), 0.05
+                )
+            await client._session.close()
+        
+        asyncio.run(run())
+    
+    @patch('sdk.async_client.aiohttp.ClientSession.post')
+    def test_batch_split_at_max_batch(self, mock_post):
+        """Test batches never exceed max_batch events."""
+        mock_post.return_value.__aenter__.return_value.status = 500
+        results = []
+        
+        async def run():
+            client = AsyncGameAnalyticsClient(
+                base_url="https://test-api.com",
+                api_key="test-key",
+                max_batch=2
+            )
+            for _ in range(3):
+                await client.send_install_event(
+                    self._install_event(),
+                    callback=lambda event, ok: results.append(ok)
+                )
+            await client.close()
+        
+        asyncio.run(run())
+        
+        assert [len(orjson.loads(c.kwargs["data"])) for c in mock_post.call_args_list] == [2, 1]
+        assert results == [False, False, False]